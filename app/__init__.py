@@ -1,14 +1,22 @@
 import os
 
-from flask import Flask
+import click
+from flask import Flask, g, has_request_context, request
+from flask_caching import Cache
+from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import inspect, text
+from sqlalchemy import event, insert
+
+from .json_provider import OrjsonProvider
 
 db = SQLAlchemy()
+cache = Cache()
+migrate = Migrate()
 
 
 def create_app():
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret-key")
     default_db_uri = os.getenv(
         "DATABASE_URL",
@@ -16,22 +24,67 @@ def create_app():
     )
     app.config["SQLALCHEMY_DATABASE_URI"] = default_db_uri
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if default_db_uri.startswith("postgresql"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "pool_size": int(os.getenv("DB_POOL_SIZE", "25")),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "25")),
+            "pool_pre_ping": True,
+            "pool_recycle": 1800,
+            "pool_use_lifo": True,
+        }
+
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        app.config["CACHE_TYPE"] = "RedisCache"
+        app.config["CACHE_REDIS_URL"] = redis_url
+    else:
+        # A per-process cache can't be invalidated across workers, so only cache with a shared backend.
+        app.config["CACHE_TYPE"] = "NullCache"
+    app.config["CACHE_DEFAULT_TIMEOUT"] = 60
 
     db.init_app(app)
+    cache.init_app(app)
+    migrate.init_app(app, db)
 
     from . import models  # noqa: F401
     from .routes import main_bp
 
-    with app.app_context():
-        db.create_all()
-        ensure_profile_photo_column()
-        seed_defaults()
-
     app.register_blueprint(main_bp)
+    app.cli.add_command(seed_command)
+    register_query_counter(app)
 
     return app
 
 
+def register_query_counter(app):
+    # Checked per request: run.py only switches on debug after create_app() returns.
+    always_on = os.getenv("SQL_QUERY_COUNTER", "").lower() in {"1", "true", "yes"}
+    threshold = int(os.getenv("SQL_QUERY_WARN_THRESHOLD", "10"))
+
+    def count_query(*_):
+        if (always_on or app.debug) and has_request_context():
+            g._sql_count = g.get("_sql_count", 0) + 1
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", count_query)
+
+    @app.after_request
+    def report_query_count(response):
+        if not (always_on or app.debug):
+            return response
+        count = g.get("_sql_count", 0)
+        response.headers["X-SQL-Count"] = str(count)
+        if count > threshold:
+            app.logger.warning(
+                "%s %s issued %d SQL queries (threshold %d)",
+                request.method,
+                request.path,
+                count,
+                threshold,
+            )
+        return response
+
+
 DEFAULT_CATEGORIES = [
     ("Food", "expense"),
     ("Transport", "expense"),
@@ -45,7 +98,7 @@ DEFAULT_CATEGORIES = [
 def seed_defaults():
     from .models import User, Category
 
-    user = User.query.get(1)
+    user = db.session.get(User, 1)
     if user is None:
         user = User(
             id=1,
@@ -62,22 +115,23 @@ def seed_defaults():
         if not user.name:
             user.name = "Demo User"
 
-    existing_categories = Category.query.filter_by(user_id=user.id).count()
-    if existing_categories == 0:
-        for name, category_type in DEFAULT_CATEGORIES:
-            db.session.add(
-                Category(user_id=user.id, name=name, type=category_type)
-            )
+    has_categories = db.session.query(
+        Category.query.filter_by(user_id=user.id).exists()
+    ).scalar()
+    if not has_categories:
+        db.session.execute(
+            insert(Category),
+            [
+                {"user_id": user.id, "name": name, "type": category_type}
+                for name, category_type in DEFAULT_CATEGORIES
+            ],
+        )
 
     db.session.commit()
 
 
-def ensure_profile_photo_column():
-    inspector = inspect(db.engine)
-    columns = {column["name"] for column in inspector.get_columns("user")}
-    if "profile_photo_url" not in columns:
-        with db.engine.connect() as connection:
-            connection.execute(
-                text('ALTER TABLE "user" ADD COLUMN profile_photo_url VARCHAR(255)')
-            )
-            connection.commit()
+@click.command("seed")
+def seed_command():
+    """Create the demo user and its default categories."""
+    seed_defaults()
+    click.echo("Seeded default data.")
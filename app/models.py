@@ -27,6 +27,11 @@ class Category(db.Model):
 
 
 class Transaction(db.Model):
+    __table_args__ = (
+        db.Index("ix_tx_user_date_type", "user_id", "transaction_date", "type"),
+        db.Index("ix_tx_user_cat_date", "user_id", "category_id", "transaction_date"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=True)
@@ -37,20 +42,38 @@ class Transaction(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "category_id": self.category_id,
-            "amount": float(self.amount) if self.amount is not None else None,
-            "type": self.type,
-            "description": self.description,
-            "transaction_date": self.transaction_date.isoformat() if self.transaction_date else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "category_name": self.category.name if self.category else None,
-        }
+        return serialize_transaction(
+            id=self.id,
+            user_id=self.user_id,
+            category_id=self.category_id,
+            amount=self.amount,
+            type=self.type,
+            description=self.description,
+            transaction_date=self.transaction_date,
+            created_at=self.created_at,
+            category_name=self.category.name if self.category else None,
+        )
+
+
+def serialize_transaction(
+    id, user_id, category_id, amount, type, description, transaction_date, created_at, category_name
+):
+    return {
+        "id": id,
+        "user_id": user_id,
+        "category_id": category_id,
+        "amount": float(amount) if amount is not None else None,
+        "type": type,
+        "description": description,
+        "transaction_date": transaction_date.isoformat() if transaction_date else None,
+        "created_at": created_at.isoformat() if created_at else None,
+        "category_name": category_name,
+    }
 
 
 class Budget(db.Model):
+    __table_args__ = (db.Index("ix_budget_user_year_month", "user_id", "year", "month"),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=True)
@@ -59,7 +82,9 @@ class Budget(db.Model):
     limit_amount = db.Column(db.Numeric(10, 2), nullable=False)
     alert_sent = db.Column(db.Boolean, default=False)
 
-    def to_dict(self):
+    def to_dict(self, category_name=None):
+        if category_name is None and self.category_id is not None:
+            category_name = self.category.name if self.category else None
         return {
             "id": self.id,
             "user_id": self.user_id,
@@ -68,7 +93,7 @@ class Budget(db.Model):
             "year": self.year,
             "limit_amount": float(self.limit_amount),
             "alert_sent": self.alert_sent,
-            "category_name": self.category.name if self.category else None,
+            "category_name": category_name,
         }
 
 
@@ -1,19 +1,38 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from functools import lru_cache, wraps
 
-from flask import Blueprint, jsonify, request, abort, render_template
-from sqlalchemy import func, and_
+from flask import Blueprint, jsonify, request, abort, current_app, g, send_from_directory
+from sqlalchemy import func, and_, case, select
+from sqlalchemy.orm import joinedload
 
-from . import db
-from .models import Transaction, Budget, Category, User
+from . import cache, db
+from .models import Transaction, Budget, Category, User, serialize_transaction
 
 
+logger = logging.getLogger(__name__)
+
 main_bp = Blueprint("main", __name__)
+alert_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="budget-alert")
+
+
+def no_autoflush(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with db.session.no_autoflush:
+            return view(*args, **kwargs)
+
+    return wrapper
 
 
 def get_current_user():
-    user = User.query.get(1)
+    user = getattr(g, "_user", None)
     if user is None:
-        abort(401, description="Demo user missing")
+        user = db.session.get(User, 1)
+        if user is None:
+            abort(401, description="Demo user missing")
+        g._user = user
     return user
 
 
@@ -74,12 +93,11 @@ def parse_budget_payload(payload):
     }
 
 
+@lru_cache(maxsize=512)
 def get_month_bounds(year: int, month: int):
     start = date(year, month, 1)
-    if month == 12:
-        end = date(year + 1, 1, 1)
-    else:
-        end = date(year, month + 1, 1)
+    year_carry, next_month = divmod(month, 12)
+    end = date(year + year_carry, next_month + 1, 1)
     return start, end
 
 
@@ -96,15 +114,43 @@ def get_expense_total(user_id: int, month: int, year: int, category_id=None):
     return float(query.scalar() or 0)
 
 
-def get_income_total(user_id: int, month: int, year: int):
+def get_income_expense_totals(user_id: int, month: int, year: int):
     start, end = get_month_bounds(year, month)
-    query = db.session.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "income",
-        Transaction.transaction_date >= start,
-        Transaction.transaction_date < end,
+    income, expense = (
+        db.session.query(
+            func.coalesce(
+                func.sum(case((Transaction.type == "income", Transaction.amount), else_=0)), 0
+            ),
+            func.coalesce(
+                func.sum(case((Transaction.type == "expense", Transaction.amount), else_=0)), 0
+            ),
+        )
+        .filter(
+            Transaction.user_id == user_id,
+            Transaction.transaction_date >= start,
+            Transaction.transaction_date < end,
+        )
+        .one()
     )
-    return float(query.scalar() or 0)
+    return float(income or 0), float(expense or 0)
+
+
+def get_expense_totals_by_category(user_id: int, month: int, year: int):
+    start, end = get_month_bounds(year, month)
+    rows = (
+        db.session.query(Transaction.category_id, func.sum(Transaction.amount))
+        .filter(
+            Transaction.user_id == user_id,
+            Transaction.type == "expense",
+            Transaction.transaction_date >= start,
+            Transaction.transaction_date < end,
+        )
+        .group_by(Transaction.category_id)
+        .all()
+    )
+    totals = {category_id: total or 0 for category_id, total in rows}
+    overall_total = float(sum(totals.values()))
+    return {category_id: float(total) for category_id, total in totals.items()}, overall_total
 
 
 def compute_budget_status(budget: Budget):
@@ -113,30 +159,108 @@ def compute_budget_status(budget: Budget):
     return {"spent": spent, "remaining": remaining}
 
 
-def send_budget_alert(user: User, budget: Budget, spent: float):
-    category_name = budget.category.name if budget.category else "Overall"
+def budget_spent_from_totals(budget: Budget, totals: dict, overall_total: float):
+    if budget.category_id:
+        return totals.get(budget.category_id, 0.0)
+    return overall_total
+
+
+def budget_status_from_totals(budget: Budget, totals: dict, overall_total: float):
+    spent = budget_spent_from_totals(budget, totals, overall_total)
+    remaining = float(budget.limit_amount) - spent
+    return {"spent": spent, "remaining": remaining}
+
+
+def budget_dict(budget: Budget, category_name, spent: float):
+    return {
+        **budget.to_dict(category_name=category_name),
+        "spent": spent,
+        "remaining": float(budget.limit_amount) - spent,
+    }
+
+
+def send_budget_alert(
+    email: str, category_name: str, month: int, year: int, spent: float, limit_amount: float
+):
     print(
-        f"[Budget Alert] {user.email}: {category_name} {budget.month}/{budget.year} spent {spent:.2f} "
-        f"over limit {float(budget.limit_amount):.2f}"
+        f"[Budget Alert] {email}: {category_name} {month}/{year} spent {spent:.2f} "
+        f"over limit {limit_amount:.2f}"
     )
 
 
+def log_budget_alert_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error("Sending budget alert failed", exc_info=error)
+
+
+def budget_alert_args(user: User, budget: Budget, spent: float):
+    # Only plain values cross the thread boundary; ORM instances are bound to the request session.
+    return (
+        user.email,
+        budget.category.name if budget.category else "Overall",
+        budget.month,
+        budget.year,
+        spent,
+        float(budget.limit_amount),
+    )
+
+
+def queue_budget_alerts(pending_alerts):
+    # Called right after commit: alert_sent is already persisted, so an alert dropped here is lost.
+    for alert_args in pending_alerts:
+        try:
+            future = alert_executor.submit(send_budget_alert, *alert_args)
+        except Exception:
+            logger.exception("Queueing budget alert failed")
+            continue
+        future.add_done_callback(log_budget_alert_failure)
+
+
+def monthly_summary_cache_key(user_id: int, month: int, year: int):
+    return f"summary:{user_id}:{month}:{year}"
+
+
+def cache_call(operation, *args):
+    # The summary cache is an optimization; a backend outage must not fail the request.
+    try:
+        return operation(*args)
+    except Exception:
+        logger.warning("Summary cache %s failed", operation.__name__, exc_info=True)
+        return None
+
+
+def invalidate_monthly_summary(user_id: int, month: int, year: int):
+    cache_call(cache.delete, monthly_summary_cache_key(user_id, month, year))
+
+
 def evaluate_budgets_for_month(user_id: int, month: int, year: int):
-    budgets = Budget.query.filter_by(user_id=user_id, month=month, year=year).all()
+    # Only updates alert_sent flags; the caller commits, passes the returned alerts to
+    # queue_budget_alerts straight away and then invalidates the month's summary.
+    budgets = (
+        Budget.query.options(joinedload(Budget.category))
+        .filter_by(user_id=user_id, month=month, year=year)
+        .all()
+    )
+    if not budgets:
+        return []
+
     user = get_current_user()
+    expense_totals, overall_expense = get_expense_totals_by_category(user_id, month, year)
+    pending_alerts = []
     for budget in budgets:
-        status = compute_budget_status(budget)
+        status = budget_status_from_totals(budget, expense_totals, overall_expense)
         over_limit = status["spent"] > float(budget.limit_amount)
         if over_limit and not budget.alert_sent:
-            send_budget_alert(user, budget, status["spent"])
+            pending_alerts.append(budget_alert_args(user, budget, status["spent"]))
             budget.alert_sent = True
         elif not over_limit and budget.alert_sent:
             budget.alert_sent = False
-    db.session.commit()
+    return pending_alerts
 
 
 def evaluate_budgets_for_transaction(transaction: Transaction):
-    evaluate_budgets_for_month(
+    return evaluate_budgets_for_month(
         transaction.user_id, transaction.transaction_date.month, transaction.transaction_date.year
     )
 
@@ -148,7 +272,7 @@ def index():
 
 @main_bp.route("/dashboard")
 def dashboard():
-    return render_template("dashboard.html")
+    return send_from_directory(current_app.static_folder, "dashboard.html", max_age=3600)
 
 
 @main_bp.route("/api/health")
@@ -157,6 +281,7 @@ def health():
 
 
 @main_bp.route("/api/profile", methods=["GET"])
+@no_autoflush
 def profile():
     user = get_current_user()
     return jsonify(
@@ -170,6 +295,7 @@ def profile():
 
 
 @main_bp.route("/api/categories", methods=["GET"])
+@no_autoflush
 def list_categories():
     user_id = get_current_user_id()
     categories = (
@@ -190,14 +316,28 @@ def list_categories():
 
 
 @main_bp.route("/api/transactions", methods=["GET"])
+@no_autoflush
 def list_transactions():
     user_id = get_current_user_id()
-    transactions = (
-        Transaction.query.filter_by(user_id=user_id)
+    rows = db.session.execute(
+        select(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.category_id,
+            Transaction.amount,
+            Transaction.type,
+            Transaction.description,
+            Transaction.transaction_date,
+            Transaction.created_at,
+            Category.name.label("category_name"),
+        )
+        .select_from(Transaction)
+        .outerjoin(Category, Transaction.category_id == Category.id)
+        .where(Transaction.user_id == user_id)
         .order_by(Transaction.transaction_date.desc())
-        .all()
-    )
-    return jsonify([tx.to_dict() for tx in transactions])
+    ).all()
+    # Serialize straight from the selected columns, without building ORM instances.
+    return jsonify([serialize_transaction(**row._mapping) for row in rows])
 
 
 @main_bp.route("/api/transactions", methods=["POST"])
@@ -208,62 +348,79 @@ def create_transaction():
 
     transaction = Transaction(user_id=user_id, **data)
     db.session.add(transaction)
+    pending_alerts = evaluate_budgets_for_transaction(transaction)
     db.session.commit()
+    queue_budget_alerts(pending_alerts)
 
-    evaluate_budgets_for_transaction(transaction)
+    tx_date = transaction.transaction_date
+    invalidate_monthly_summary(user_id, tx_date.month, tx_date.year)
     return jsonify(transaction.to_dict()), 201
 
 
 @main_bp.route("/api/transactions/<int:transaction_id>", methods=["PUT"])
 def update_transaction(transaction_id):
     user_id = get_current_user_id()
-    transaction = Transaction.query.filter_by(id=transaction_id, user_id=user_id).first()
-    if transaction is None:
+    transaction = db.session.get(Transaction, transaction_id)
+    if transaction is None or transaction.user_id != user_id:
         abort(404, description="Transaction not found")
 
     payload = request.get_json(silent=True)
     data = parse_transaction_payload(payload)
 
+    previous_date = transaction.transaction_date
     for key, value in data.items():
         setattr(transaction, key, value)
 
+    pending_alerts = evaluate_budgets_for_transaction(transaction)
     db.session.commit()
-    evaluate_budgets_for_transaction(transaction)
+    queue_budget_alerts(pending_alerts)
+
+    tx_date = transaction.transaction_date
+    invalidate_monthly_summary(user_id, previous_date.month, previous_date.year)
+    invalidate_monthly_summary(user_id, tx_date.month, tx_date.year)
     return jsonify(transaction.to_dict())
 
 
 @main_bp.route("/api/transactions/<int:transaction_id>", methods=["DELETE"])
 def delete_transaction(transaction_id):
     user_id = get_current_user_id()
-    transaction = Transaction.query.filter_by(id=transaction_id, user_id=user_id).first()
-    if transaction is None:
+    transaction = db.session.get(Transaction, transaction_id)
+    if transaction is None or transaction.user_id != user_id:
         abort(404, description="Transaction not found")
 
     transaction_month = transaction.transaction_date.month
     transaction_year = transaction.transaction_date.year
 
     db.session.delete(transaction)
+    pending_alerts = evaluate_budgets_for_month(user_id, transaction_month, transaction_year)
     db.session.commit()
-    evaluate_budgets_for_month(user_id, transaction_month, transaction_year)
+    queue_budget_alerts(pending_alerts)
+
+    invalidate_monthly_summary(user_id, transaction_month, transaction_year)
     return jsonify({"deleted": transaction_id})
 
 
 @main_bp.route("/api/budgets", methods=["GET"])
+@no_autoflush
 def list_budgets():
     user_id = get_current_user_id()
     month = request.args.get("month", type=int)
     year = request.args.get("year", type=int)
 
-    query = Budget.query.filter_by(user_id=user_id)
+    query = Budget.query.options(joinedload(Budget.category)).filter_by(user_id=user_id)
     if month:
         query = query.filter_by(month=month)
     if year:
         query = query.filter_by(year=year)
 
     budgets = query.order_by(Budget.year.desc(), Budget.month.desc()).all()
+    totals_by_month = {}
     response = []
     for budget in budgets:
-        status = compute_budget_status(budget)
+        key = (budget.month, budget.year)
+        if key not in totals_by_month:
+            totals_by_month[key] = get_expense_totals_by_category(user_id, *key)
+        status = budget_status_from_totals(budget, *totals_by_month[key])
         response.append({**budget.to_dict(), **status})
     return jsonify(response)
 
@@ -276,54 +433,70 @@ def create_budget():
 
     budget = Budget(user_id=user_id, **data)
     db.session.add(budget)
+    pending_alerts = evaluate_budgets_for_month(user_id, budget.month, budget.year)
     db.session.commit()
-    evaluate_budgets_for_month(user_id, budget.month, budget.year)
+    queue_budget_alerts(pending_alerts)
+
+    invalidate_monthly_summary(user_id, budget.month, budget.year)
     return jsonify({**budget.to_dict(), **compute_budget_status(budget)}), 201
 
 
 @main_bp.route("/api/budgets/<int:budget_id>", methods=["PUT"])
 def update_budget(budget_id):
     user_id = get_current_user_id()
-    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
-    if budget is None:
+    budget = db.session.get(Budget, budget_id)
+    if budget is None or budget.user_id != user_id:
         abort(404, description="Budget not found")
 
     payload = request.get_json(silent=True)
     data = parse_budget_payload(payload)
 
+    previous_month, previous_year = budget.month, budget.year
     for key, value in data.items():
         setattr(budget, key, value)
 
+    pending_alerts = evaluate_budgets_for_month(user_id, budget.month, budget.year)
     db.session.commit()
-    evaluate_budgets_for_month(user_id, budget.month, budget.year)
+    queue_budget_alerts(pending_alerts)
+
+    invalidate_monthly_summary(user_id, previous_month, previous_year)
+    invalidate_monthly_summary(user_id, budget.month, budget.year)
     return jsonify({**budget.to_dict(), **compute_budget_status(budget)})
 
 
 @main_bp.route("/api/budgets/<int:budget_id>", methods=["DELETE"])
 def delete_budget(budget_id):
     user_id = get_current_user_id()
-    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
-    if budget is None:
+    budget = db.session.get(Budget, budget_id)
+    if budget is None or budget.user_id != user_id:
         abort(404, description="Budget not found")
 
     month, year = budget.month, budget.year
     db.session.delete(budget)
+    pending_alerts = evaluate_budgets_for_month(user_id, month, year)
     db.session.commit()
-    evaluate_budgets_for_month(user_id, month, year)
+    queue_budget_alerts(pending_alerts)
+
+    invalidate_monthly_summary(user_id, month, year)
     return jsonify({"deleted": budget_id})
 
 
 @main_bp.route("/api/summary/monthly", methods=["GET"])
+@no_autoflush
 def monthly_summary():
     user_id = get_current_user_id()
     today = date.today()
     month = request.args.get("month", type=int) or today.month
     year = request.args.get("year", type=int) or today.year
 
+    cache_key = monthly_summary_cache_key(user_id, month, year)
+    summary = cache_call(cache.get, cache_key)
+    if summary is not None:
+        return jsonify(summary)
+
     start, end = get_month_bounds(year, month)
 
-    total_income = get_income_total(user_id, month, year)
-    total_expense = get_expense_total(user_id, month, year)
+    total_income, total_expense = get_income_expense_totals(user_id, month, year)
 
     category_rows = (
         db.session.query(
@@ -347,29 +520,38 @@ def monthly_summary():
         .all()
     )
 
-    budgets = (
-        Budget.query.filter_by(user_id=user_id, month=month, year=year)
-        .order_by(Budget.category_id.is_(None).desc())
-        .all()
-    )
-    budgets_payload = [{**budget.to_dict(), **compute_budget_status(budget)} for budget in budgets]
+    budget_rows = db.session.execute(
+        select(Budget, Category.name)
+        .outerjoin(Category, Budget.category_id == Category.id)
+        .where(Budget.user_id == user_id, Budget.month == month, Budget.year == year)
+        .order_by(Budget.category_id.isnot(None), Category.name)
+    ).all()
+    expense_totals, overall_expense = get_expense_totals_by_category(user_id, month, year)
+    budgets_payload = [
+        budget_dict(
+            budget,
+            category_name,
+            budget_spent_from_totals(budget, expense_totals, overall_expense),
+        )
+        for budget, category_name in budget_rows
+    ]
 
-    return jsonify(
-        {
-            "month": month,
-            "year": year,
-            "total_income": total_income,
-            "total_expense": total_expense,
-            "net": total_income - total_expense,
-            "by_category": [
-                {
-                    "category_id": row.id,
-                    "category_name": row.name,
-                    "type": row.type,
-                    "total": float(row.total or 0),
-                }
-                for row in category_rows
-            ],
-            "budgets": budgets_payload,
-        }
-    )
+    summary = {
+        "month": month,
+        "year": year,
+        "total_income": total_income,
+        "total_expense": total_expense,
+        "net": total_income - total_expense,
+        "by_category": [
+            {
+                "category_id": row.id,
+                "category_name": row.name,
+                "type": row.type,
+                "total": float(row.total or 0),
+            }
+            for row in category_rows
+        ],
+        "budgets": budgets_payload,
+    }
+    cache_call(cache.set, cache_key, summary)
+    return jsonify(summary)
@@ -0,0 +1,27 @@
+"""add user profile_photo_url
+
+Revision ID: 9d3f6a8e2c15
+Revises: 4b1e0c2d9a71
+Create Date: 2026-10-15 12:01:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f6a8e2c15'
+down_revision = '4b1e0c2d9a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped before migrations may already have the column.
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')}
+    if 'profile_photo_url' not in columns:
+        op.add_column('user', sa.Column('profile_photo_url', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    op.drop_column('user', 'profile_photo_url')
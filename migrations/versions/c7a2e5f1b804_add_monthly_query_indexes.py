@@ -0,0 +1,36 @@
+"""add monthly query indexes
+
+Revision ID: c7a2e5f1b804
+Revises: 9d3f6a8e2c15
+Create Date: 2026-10-15 12:02:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a2e5f1b804'
+down_revision = '9d3f6a8e2c15'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_tx_user_date_type', 'transaction', ['user_id', 'transaction_date', 'type']),
+    ('ix_tx_user_cat_date', 'transaction', ['user_id', 'category_id', 'transaction_date']),
+    ('ix_budget_user_year_month', 'budget', ['user_id', 'year', 'month']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, if_not_exists=True, postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)